@@ -9,31 +9,113 @@ import certifi
 ssl._create_default_https_context = lambda: ssl.create_default_context(cafile=certifi.where())
 
 import ee
+from google.auth.exceptions import DefaultCredentialsError, RefreshError
 import numpy as np
 import pandas as pd
+import rasterio
+import requests
+import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.colors import ListedColormap
 import seaborn as sns
 from datetime import datetime, timedelta
+import functools
+import hashlib
+import io
+import os
+import time
 import geemap
 import folium
 
+# Numba is optional; without it the local fire risk score falls back to NumPy
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# localtileserver is optional; only needed for visualize_local_tiles()
+try:
+    from localtileserver import TileClient, get_folium_tile_layer
+    LOCALTILESERVER_AVAILABLE = True
+except ImportError:
+    LOCALTILESERVER_AVAILABLE = False
+
 # ============ CONFIGURATION ============
 # Your Earth Engine Project ID
 PROJECT_ID = 'sciencef-476305'
 
+# Client-side AOI geometries with more vertices than this are simplified once
+SIMPLIFY_MIN_VERTICES = 20
+
+# Seconds to wait on the GeoTIFF download before giving up
+DOWNLOAD_TIMEOUT = 300
+
+# Marker written after a successful initialization; while it is fresh, a failed
+# init is treated as transient instead of opening the browser sign-in
+SESSION_MARKER = os.path.expanduser('~/.config/earthengine/.session_ok')
+SESSION_TTL = 3600  # seconds
+
+def _session_recently_ok():
+    """Check whether Earth Engine initialized successfully within SESSION_TTL"""
+    try:
+        return os.path.getmtime(SESSION_MARKER) > time.time() - SESSION_TTL
+    except OSError:
+        return False
+
+def _mark_session_ok():
+    """Record a successful initialization"""
+    try:
+        os.makedirs(os.path.dirname(SESSION_MARKER), exist_ok=True)
+        with open(SESSION_MARKER, 'w') as f:
+            f.write(str(time.time()))
+    except OSError:
+        pass
+
+def _is_auth_error(error):
+    """Whether an exception means the stored credentials are missing or rejected"""
+    # Earth Engine may wrap the google-auth error, so check the whole chain
+    while error is not None:
+        if isinstance(error, (RefreshError, DefaultCredentialsError)):
+            return True
+        # Expired/revoked tokens, or Earth Engine asking to authorize
+        message = str(error).lower()
+        if 'invalid_grant' in message or 'authorize' in message:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def _initialized_project():
+    """Project Earth Engine is currently initialized with, if known"""
+    # Current clients keep it in the module state; older ones used a module global
+    get_state = getattr(ee.data, '_get_state', None)
+    if get_state is not None:
+        return getattr(get_state(), 'cloud_api_user_project', None)
+    return getattr(ee.data, '_cloud_api_user_project', None)
+
 # Initialize Earth Engine
 def initialize_earth_engine(project_id=None):
     """Initialize Earth Engine with automatic authentication"""
     if project_id is None:
         project_id = PROJECT_ID
     
+    # Already initialized for this project in this process (e.g. module re-imported in Jupyter)
+    if ee.data.is_initialized() and _initialized_project() == project_id:
+        return True
+    
     try:
         # Try to initialize with project (force the project parameter)
         ee.Initialize(project=project_id)
+        _mark_session_ok()
         print(f"✅ Earth Engine initialized successfully with project: {project_id}")
         return True
     except Exception as e:
+        if _session_recently_ok() and not _is_auth_error(e):
+            # Credentials worked recently, so don't block on an interactive sign-in
+            print(f"⚠️  Earth Engine initialization failed: {e}")
+            print("Credentials were valid within the last hour; check your connection and retry.")
+            return False
+        
         print(f"⚠️  Not authenticated yet: {e}")
         print(f"\n🔐 Starting authentication process for project: {project_id}...")
         print("A browser window will open for you to sign in with Google.")
@@ -43,6 +125,7 @@ def initialize_earth_engine(project_id=None):
             ee.Authenticate()
             # Initialize after authentication with project (explicitly set)
             ee.Initialize(project=project_id)
+            _mark_session_ok()
             print(f"✅ Authentication successful! Earth Engine is ready with project: {project_id}")
             return True
         except Exception as auth_error:
@@ -60,12 +143,63 @@ if not initialize_earth_engine():
     print("Please run auth_fix.py first to authenticate.")
 
 
+def _round_coordinates(coords, ndigits=5):
+    """Round (nested) GeoJSON coordinates to the given number of decimals"""
+    if isinstance(coords, (list, tuple)):
+        return [_round_coordinates(c, ndigits) for c in coords]
+    return round(coords, ndigits)
+
+
+def _round_geojson(geo_json, ndigits=5):
+    """
+    Return a copy of a GeoJSON geometry with rounded coordinates, including
+    GeometryCollections (the input, which may belong to an ee.Geometry, is not modified)
+    """
+    rounded = dict(geo_json)
+    if 'coordinates' in rounded:
+        rounded['coordinates'] = _round_coordinates(rounded['coordinates'], ndigits)
+    if 'geometries' in rounded:
+        rounded['geometries'] = [_round_geojson(g, ndigits) for g in rounded['geometries']]
+    return rounded
+
+
+def _count_vertices(geo_json):
+    """Count the coordinate pairs in a GeoJSON geometry"""
+    def count(coords):
+        if coords and isinstance(coords[0], (list, tuple)):
+            return sum(count(c) for c in coords)
+        return 1 if coords else 0
+    
+    total = count(geo_json.get('coordinates', []))
+    return total + sum(_count_vertices(g) for g in geo_json.get('geometries', []))
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def fire_risk_local(ndvi, ndmi, bsi, red, nir, out):
+        """
+        Compute the fire risk score (0-100) on flattened local arrays
+        
+        Same weighting as GEEFireRiskAnalyzer.calculate_fire_risk_score,
+        evaluated in one fused pass. All arguments are 1D arrays of equal length.
+        """
+        for i in prange(out.size):
+            stress = min(10.0, max(0.0, red[i] / (nir[i] + 0.0001) * 10))
+            score = 40 * (1 - (ndvi[i] + 1) / 2) \
+                + 30 * (1 - (ndmi[i] + 1) / 2) \
+                + 20 * (bsi[i] + 1) / 2 \
+                + stress
+            out[i] = min(100.0, max(0.0, score))
+        return out
+
+
 class GEEFireRiskAnalyzer:
     """
     Fire Risk Analyzer using Google Earth Engine data
     """
     
-    def __init__(self, area_of_interest, start_date, end_date, satellite='sentinel2'):
+    def __init__(self, area_of_interest, start_date, end_date, satellite='sentinel2',
+                 use_cached_composite=False, composite_asset_id=None):
         """
         Initialize analyzer with Earth Engine data
         
@@ -82,9 +216,17 @@ class GEEFireRiskAnalyzer:
             End date in format 'YYYY-MM-DD'
         satellite : str
             'sentinel2' or 'landsat8' or 'landsat9'
+        use_cached_composite : bool
+            Load the median composite from an Earth Engine asset saved with
+            cache_composite() instead of recomputing it, if the asset exists
+        composite_asset_id : str
+            Asset to use for the cached composite. Defaults to a name derived
+            from the AOI, dates and satellite
         """
         # Convert area_of_interest to ee.Geometry if needed
         if isinstance(area_of_interest, list):
+            # ~1m precision is plenty and keeps every request payload small
+            area_of_interest = [round(coord, 5) for coord in area_of_interest]
             if len(area_of_interest) == 2:  # Point [lon, lat]
                 self.aoi = ee.Geometry.Point(area_of_interest)
             elif len(area_of_interest) == 4:  # Rectangle
@@ -92,20 +234,70 @@ class GEEFireRiskAnalyzer:
             else:
                 raise ValueError("area_of_interest list must be [lon, lat] or [lon_min, lat_min, lon_max, lat_max]")
         else:
-            self.aoi = area_of_interest
+            if area_of_interest.func is None:
+                # Client-side geometry: coordinates are already local, so points,
+                # rectangles and simple polygons need no round-trip
+                geo_json = area_of_interest.toGeoJSON()
+                if _count_vertices(geo_json) > SIMPLIFY_MIN_VERTICES:
+                    # Complex polygon: simplify once here so every later request is smaller
+                    geo_json = area_of_interest.simplify(maxError=1).getInfo()
+            else:
+                # Computed geometry (e.g. point.buffer()): simplify once and fetch the
+                # result, so later requests send the reduced coordinates instead of
+                # the full computation plus a simplify call
+                geo_json = area_of_interest.simplify(maxError=1).getInfo()
+            self.aoi = ee.Geometry(_round_geojson(geo_json))
         
         self.start_date = start_date
         self.end_date = end_date
         self.satellite = satellite.lower()
+        self.use_cached_composite = use_cached_composite
+        self.composite_asset_id = self._asset_path(
+            composite_asset_id or self._default_composite_asset_id()
+        )
+        self.image_count = None
+        self.loaded_from_cache = False  # True when self.image is the cached asset
+        self._centroid = None  # Cached [lon, lat] of the AOI centroid
         
         # Load imagery
         self.image = self._load_imagery()
         self.image_data = None  # Will store downloaded numpy arrays
-        
+        self.image_profile = None  # Raster profile (transform, crs) of the download
+        self._fig = None  # Reused by visualize_local_analysis()
+        self._axes = None
+        self._colorbars = []
+        
+    def _default_composite_asset_id(self):
+        """Build a stable asset name from the AOI, date range and satellite"""
+        key = f"{self.aoi.serialize()}|{self.start_date}|{self.end_date}|{self.satellite}"
+        return f"fire_risk_composite_{hashlib.md5(key.encode()).hexdigest()[:16]}"
+    
+    @staticmethod
+    def _asset_path(asset_id):
+        """Expand a bare asset name into a path under the project's assets"""
+        if '/' in asset_id:
+            return asset_id
+        return f"projects/{PROJECT_ID}/assets/{asset_id}"
+    
     def _load_imagery(self):
         """
         Load satellite imagery from Earth Engine
         """
+        if self.use_cached_composite:
+            try:
+                ee.data.getAsset(self.composite_asset_id)
+                print(f"Using cached composite: {self.composite_asset_id}")
+                self.loaded_from_cache = True
+                return ee.Image(self.composite_asset_id)
+            except ee.EEException:
+                print("No cached composite found, building it from the image collection")
+        
+        return self._build_composite()
+    
+    def _build_composite(self):
+        """
+        Build the median composite from the satellite image collection
+        """
         if self.satellite == 'sentinel2':
             # Sentinel-2 Level 2A (atmospherically corrected)
             collection = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') \
@@ -113,10 +305,17 @@ class GEEFireRiskAnalyzer:
                 .filterDate(self.start_date, self.end_date) \
                 .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20))
             
-            print(f"Found {collection.size().getInfo()} Sentinel-2 images")
+            self.image_count = collection.size().getInfo()
+            print(f"Found {self.image_count} Sentinel-2 images")
+            
+            # Resample the 20m SWIR bands bilinearly in each scene before compositing
+            # (the median is computed from the source scenes, so resampling the
+            # composite itself would leave them nearest-neighbour)
+            def resample_swir(img):
+                return img.addBands(img.select(['B11', 'B12']).resample('bilinear'), None, True)
             
             # Get median composite (cloud-free)
-            image = collection.median()
+            image = collection.map(resample_swir).median()
             
             # Select and rename bands
             image = image.select(
@@ -124,6 +323,9 @@ class GEEFireRiskAnalyzer:
                 ['blue', 'green', 'red', 'nir', 'swir1', 'swir2']
             )
             
+            # Native 10m projection of the red band
+            native_band = 'B4'
+            
         elif self.satellite in ['landsat8', 'landsat9']:
             # Landsat 8/9 Collection 2 Level 2
             dataset = 'LANDSAT/LC08/C02/T1_L2' if self.satellite == 'landsat8' else 'LANDSAT/LC09/C02/T1_L2'
@@ -133,32 +335,80 @@ class GEEFireRiskAnalyzer:
                 .filterDate(self.start_date, self.end_date) \
                 .filter(ee.Filter.lt('CLOUD_COVER', 20))
             
-            print(f"Found {collection.size().getInfo()} {self.satellite.upper()} images")
+            self.image_count = collection.size().getInfo()
+            print(f"Found {self.image_count} {self.satellite.upper()} images")
             
             # Get median composite
             image = collection.median()
             
-            # Apply scaling factors and select bands
-            def apply_scale_factors(img):
-                optical = img.select('SR_B.').multiply(0.0000275).add(-0.2)
-                thermal = img.select('ST_B.*').multiply(0.00341802).add(149.0)
-                return img.addBands(optical, None, True).addBands(thermal, None, True)
-            
-            image = apply_scale_factors(image)
-            
-            # Select and rename bands
+            # Select and rename bands, then apply the optical scaling factors
+            # (thermal bands are never used, so they are not scaled)
             image = image.select(
                 ['SR_B2', 'SR_B3', 'SR_B4', 'SR_B5', 'SR_B6', 'SR_B7'],
                 ['blue', 'green', 'red', 'nir', 'swir1', 'swir2']
-            )
+            ).multiply(0.0000275).add(-0.2)
+            
+            # Native 30m projection of the red band
+            native_band = 'SR_B4'
         else:
             raise ValueError("satellite must be 'sentinel2', 'landsat8', or 'landsat9'")
         
+        # A median composite loses the source projection. Pin it once here to the
+        # native projection so every downstream index and reduction shares one grid.
+        # setDefaultProjection is used rather than reproject() so zoomed-out map
+        # tiles are not forced to compute at full resolution.
+        if self.image_count:
+            native_projection = collection.first().select(native_band).projection()
+            image = image.setDefaultProjection(native_projection)
+        
         return image
     
+    # Cached analysis layers, built once per analyzer and shared by every output
+    @functools.cached_property
+    def ndvi(self):
+        return self.calculate_ndvi()
+    
+    @functools.cached_property
+    def savi(self):
+        return self.calculate_savi()
+    
+    @functools.cached_property
+    def evi(self):
+        return self.calculate_evi()
+    
+    @functools.cached_property
+    def ndmi(self):
+        return self.calculate_ndmi()
+    
+    @functools.cached_property
+    def nbr(self):
+        return self.calculate_nbr()
+    
+    @functools.cached_property
+    def bsi(self):
+        return self.calculate_bsi()
+    
+    @functools.cached_property
+    def color_metrics(self):
+        return self.analyze_plant_color()
+    
+    @functools.cached_property
+    def fire_risk(self):
+        return self.calculate_fire_risk_score()
+    
+    @functools.cached_property
+    def risk_class(self):
+        return self.classify_fire_risk(self.fire_risk)
+    
+    def _get_center(self):
+        """Return the AOI centroid as [lon, lat], fetching it only once"""
+        if self._centroid is None:
+            self._centroid = self.aoi.centroid().coordinates().getInfo()
+        return self._centroid
+    
     def calculate_ndvi(self):
         """Calculate NDVI"""
-        ndvi = self.image.normalizedDifference(['nir', 'red']).rename('NDVI')
+        ndvi = self.image.normalizedDifference(['nir', 'red']).rename('NDVI').toFloat()
         return ndvi
     
     def calculate_savi(self, L=0.5):
@@ -168,7 +418,7 @@ class GEEFireRiskAnalyzer:
         
         savi = nir.subtract(red).divide(
             nir.add(red).add(L)
-        ).multiply(1 + L).rename('SAVI')
+        ).multiply(1 + L).rename('SAVI').toFloat()
         
         return savi
     
@@ -180,18 +430,18 @@ class GEEFireRiskAnalyzer:
         
         evi = nir.subtract(red).divide(
             nir.add(red.multiply(6)).subtract(blue.multiply(7.5)).add(1)
-        ).multiply(2.5).rename('EVI')
+        ).multiply(2.5).rename('EVI').toFloat()
         
         return evi
     
     def calculate_ndmi(self):
         """Calculate NDMI (Normalized Difference Moisture Index)"""
-        ndmi = self.image.normalizedDifference(['nir', 'swir1']).rename('NDMI')
+        ndmi = self.image.normalizedDifference(['nir', 'swir1']).rename('NDMI').toFloat()
         return ndmi
     
     def calculate_nbr(self):
         """Calculate NBR (Normalized Burn Ratio)"""
-        nbr = self.image.normalizedDifference(['nir', 'swir2']).rename('NBR')
+        nbr = self.image.normalizedDifference(['nir', 'swir2']).rename('NBR').toFloat()
         return nbr
     
     def calculate_bsi(self):
@@ -203,15 +453,15 @@ class GEEFireRiskAnalyzer:
         
         bsi = swir1.add(red).subtract(nir).subtract(blue).divide(
             swir1.add(red).add(nir).add(blue)
-        ).rename('BSI')
+        ).rename('BSI').toFloat()
         
         return bsi
     
     def analyze_plant_color(self):
         """Analyze plant color characteristics"""
-        greenness = self.image.select('nir').subtract(self.image.select('red')).rename('Greenness')
-        redness = self.image.select('red').divide(self.image.select('nir').add(0.0001)).rename('Redness')
-        brightness = self.image.select(['red', 'green', 'blue']).reduce(ee.Reducer.mean()).rename('Brightness')
+        greenness = self.image.select('nir').subtract(self.image.select('red')).rename('Greenness').toFloat()
+        redness = self.image.select('red').divide(self.image.select('nir').add(0.0001)).rename('Redness').toFloat()
+        brightness = self.image.select(['red', 'green', 'blue']).reduce(ee.Reducer.mean()).rename('Brightness').toFloat()
         
         return {
             'greenness': greenness,
@@ -227,30 +477,25 @@ class GEEFireRiskAnalyzer:
         --------
         ee.Image : Fire risk score (0-100)
         """
-        # Calculate indices
-        ndvi = self.calculate_ndvi()
-        ndmi = self.calculate_ndmi()
-        bsi = self.calculate_bsi()
-        
-        # Factor 1: Vegetation health (40% weight)
-        # Normalize NDVI from [-1,1] to [0,1], then invert (low veg = high risk)
-        veg_risk = ndvi.add(1).divide(2).multiply(-1).add(1).multiply(40)
-        
-        # Factor 2: Moisture content (30% weight)
-        # Normalize NDMI from [-1,1] to [0,1], then invert (low moisture = high risk)
-        moisture_risk = ndmi.add(1).divide(2).multiply(-1).add(1).multiply(30)
-        
-        # Factor 3: Soil/bare ground (20% weight)
-        # Normalize BSI from [-1,1] to [0,1] (high bare soil = high risk)
-        soil_risk = bsi.add(1).divide(2).multiply(20)
-        
-        # Factor 4: Plant stress (10% weight)
-        redness = self.analyze_plant_color()['redness']
-        stress_risk = redness.multiply(10).clamp(0, 10)
-        
-        # Combine all factors
-        fire_risk = veg_risk.add(moisture_risk).add(soil_risk).add(stress_risk).clamp(0, 100)
-        fire_risk = fire_risk.rename('Fire_Risk_Score')
+        # All four weighted factors are evaluated in a single expression:
+        #   Vegetation health (40%): NDVI normalized to [0,1] and inverted (low veg = high risk)
+        #   Moisture content (30%): NDMI normalized to [0,1] and inverted (low moisture = high risk)
+        #   Soil/bare ground (20%): BSI normalized to [0,1] (high bare soil = high risk)
+        #   Plant stress (10%): redness (red/nir) scaled and clamped to [0,10]
+        fire_risk = self.image.expression(
+            '40 * (1 - (ndvi + 1) / 2)'
+            ' + 30 * (1 - (ndmi + 1) / 2)'
+            ' + 20 * (bsi + 1) / 2'
+            ' + min(10, max(0, red / (nir + 0.0001) * 10))',
+            {
+                'ndvi': self.ndvi,
+                'ndmi': self.ndmi,
+                'bsi': self.bsi,
+                'red': self.image.select('red'),
+                'nir': self.image.select('nir')
+            }
+        ).clamp(0, 100)
+        fire_risk = fire_risk.rename('Fire_Risk_Score').toFloat()
         
         return fire_risk
     
@@ -262,12 +507,11 @@ class GEEFireRiskAnalyzer:
         --------
         ee.Image : Risk classes (1-5)
         """
-        risk_classes = ee.Image(1) \
-            .where(fire_risk_score.gte(20), 2) \
-            .where(fire_risk_score.gte(40), 3) \
-            .where(fire_risk_score.gte(60), 4) \
-            .where(fire_risk_score.gte(80), 5) \
-            .rename('Risk_Class')
+        # Bin the score into 20-point bands: [0,20) -> 1, [20,40) -> 2, ..., [80,100] -> 5
+        risk_classes = fire_risk_score.divide(20).floor().add(1) \
+            .min(5).max(1) \
+            .rename('Risk_Class') \
+            .toByte()
         
         return risk_classes
     
@@ -275,25 +519,16 @@ class GEEFireRiskAnalyzer:
         """
         Create composite image with all analysis layers
         """
-        ndvi = self.calculate_ndvi()
-        savi = self.calculate_savi()
-        evi = self.calculate_evi()
-        ndmi = self.calculate_ndmi()
-        nbr = self.calculate_nbr()
-        bsi = self.calculate_bsi()
-        fire_risk = self.calculate_fire_risk_score()
-        risk_class = self.classify_fire_risk(fire_risk)
-        
-        color_metrics = self.analyze_plant_color()
+        color_metrics = self.color_metrics
         
         # Combine all into single image
         composite = self.image.addBands([
-            ndvi, savi, evi, ndmi, nbr, bsi,
+            self.ndvi, self.savi, self.evi, self.ndmi, self.nbr, self.bsi,
             color_metrics['greenness'],
             color_metrics['redness'],
             color_metrics['brightness'],
-            fire_risk,
-            risk_class
+            self.fire_risk,
+            self.risk_class
         ])
         
         return composite
@@ -303,7 +538,7 @@ class GEEFireRiskAnalyzer:
         Create interactive map with all layers using geemap
         """
         # Create map centered on AOI
-        center = self.aoi.centroid().coordinates().getInfo()
+        center = self._get_center()
         Map = geemap.Map(center=[center[1], center[0]], zoom=12)
         
         # Add base layers
@@ -313,20 +548,19 @@ class GEEFireRiskAnalyzer:
         
         # Add NDVI
         ndvi_viz = {'min': -0.2, 'max': 0.8, 'palette': ['red', 'yellow', 'green']}
-        Map.addLayer(self.calculate_ndvi(), ndvi_viz, 'NDVI', False)
+        Map.addLayer(self.ndvi, ndvi_viz, 'NDVI', False)
         
         # Add NDMI (Moisture)
         ndmi_viz = {'min': -0.5, 'max': 0.5, 'palette': ['red', 'yellow', 'blue']}
-        Map.addLayer(self.calculate_ndmi(), ndmi_viz, 'NDMI (Moisture)', False)
+        Map.addLayer(self.ndmi, ndmi_viz, 'NDMI (Moisture)', False)
         
         # Add Fire Risk Score
         fire_risk_viz = {'min': 0, 'max': 100, 'palette': ['green', 'yellow', 'orange', 'red', 'darkred']}
-        Map.addLayer(self.calculate_fire_risk_score(), fire_risk_viz, 'Fire Risk Score')
+        Map.addLayer(self.fire_risk, fire_risk_viz, 'Fire Risk Score')
         
         # Add Fire Risk Classification
         risk_class_viz = {'min': 1, 'max': 5, 'palette': ['darkgreen', 'green', 'yellow', 'orange', 'red']}
-        Map.addLayer(self.classify_fire_risk(self.calculate_fire_risk_score()), 
-                    risk_class_viz, 'Fire Risk Classification')
+        Map.addLayer(self.risk_class, risk_class_viz, 'Fire Risk Classification')
         
         # Add AOI boundary
         Map.addLayer(self.aoi, {'color': 'white'}, 'Area of Interest')
@@ -352,26 +586,26 @@ class GEEFireRiskAnalyzer:
         print(f"Downloading data at {scale}m resolution...")
         print("This may take a few minutes depending on area size...")
         
-        # Create composite
-        composite = self.create_analysis_composite()
-        
-        # Get region
-        region = self.aoi.bounds().getInfo()['coordinates']
+        # Only the raw reflectance bands are downloaded; indices are derived locally
+        band_names = ['blue', 'green', 'red', 'nir', 'swir1', 'swir2']
         
         # Download bands
         try:
-            # Sample the image to get data
-            sample = composite.sampleRectangle(region=self.aoi, defaultValue=0)
+            # Fetch all bands as a single binary GeoTIFF (masked pixels filled with 0)
+            url = self.image.select(band_names).toFloat().unmask(0).getDownloadURL({
+                'scale': scale,
+                'region': self.aoi,
+                'format': 'GEO_TIFF'
+            })
+            response = requests.get(url, timeout=DOWNLOAD_TIMEOUT)
+            response.raise_for_status()
             
             # Convert to numpy arrays
-            data = {}
-            band_names = composite.bandNames().getInfo()
+            with rasterio.open(io.BytesIO(response.content)) as src:
+                data = {name: src.read(i + 1) for i, name in enumerate(band_names)}
+                self.image_profile = src.profile
             
-            for band in band_names:
-                try:
-                    data[band] = np.array(sample.get(band).getInfo())
-                except:
-                    print(f"Warning: Could not download band {band}")
+            data.update(self._compute_indices_numpy(data))
             
             self.image_data = data
             print(f"Successfully downloaded {len(data)} bands")
@@ -382,10 +616,89 @@ class GEEFireRiskAnalyzer:
             print("Try reducing the area size or using export_to_drive() for large areas")
             return None
     
+    def _compute_indices_numpy(self, bands, L=0.5):
+        """
+        Compute the analysis layers locally from downloaded reflectance bands
+        
+        Mirrors the Earth Engine calculations in calculate_* so that only the
+        6 raw bands need to be transferred.
+        
+        Parameters:
+        -----------
+        bands : dict
+            Numpy arrays for 'blue', 'green', 'red', 'nir', 'swir1', 'swir2'
+        L : float
+            Soil brightness correction factor for SAVI
+        
+        Returns:
+        --------
+        dict : Dictionary with float32 numpy arrays for each index
+        """
+        blue, green, red, nir, swir1, swir2 = (
+            np.asarray(bands[name], dtype=np.float32)
+            for name in ['blue', 'green', 'red', 'nir', 'swir1', 'swir2']
+        )
+        
+        def normalized_difference(a, b):
+            result = a - b
+            np.divide(result, a + b + 1e-12, out=result)
+            return result
+        
+        ndvi = normalized_difference(nir, red)
+        ndmi = normalized_difference(nir, swir1)
+        nbr = normalized_difference(nir, swir2)
+        
+        greenness = nir - red
+        
+        savi = greenness * (1 + L)
+        np.divide(savi, nir + red + L, out=savi)
+        
+        evi = greenness * 2.5
+        np.divide(evi, nir + 6 * red - 7.5 * blue + 1, out=evi)
+        
+        bsi = swir1 + red - nir - blue
+        np.divide(bsi, swir1 + red + nir + blue + 1e-12, out=bsi)
+        
+        redness = np.divide(red, nir + 0.0001)
+        brightness = (red + green + blue) / 3
+        
+        # Same weighting as calculate_fire_risk_score
+        if NUMBA_AVAILABLE:
+            fire_risk = np.empty_like(ndvi)
+            fire_risk_local(ndvi.ravel(), ndmi.ravel(), bsi.ravel(),
+                            red.ravel(), nir.ravel(), fire_risk.reshape(-1))
+        else:
+            fire_risk = 40 * (1 - (ndvi + 1) / 2) \
+                + 30 * (1 - (ndmi + 1) / 2) \
+                + 20 * (bsi + 1) / 2 \
+                + np.clip(redness * 10, 0, 10)
+            np.clip(fire_risk, 0, 100, out=fire_risk)
+        
+        risk_class = np.clip(np.floor(fire_risk / 20) + 1, 1, 5).astype(np.uint8)
+        
+        return {
+            'NDVI': ndvi,
+            'SAVI': savi,
+            'EVI': evi,
+            'NDMI': ndmi,
+            'NBR': nbr,
+            'BSI': bsi,
+            'Greenness': greenness,
+            'Redness': redness,
+            'Brightness': brightness,
+            'Fire_Risk_Score': fire_risk,
+            'Risk_Class': risk_class
+        }
+    
     def export_to_drive(self, description='fire_risk_analysis', scale=30):
         """
         Export analysis to Google Drive (better for large areas)
         
+        The file is written as a Cloud Optimized GeoTIFF with internal
+        overviews, so tile clients only read the resolution they display.
+        When opening it over HTTP with GDAL/rasterio, set
+        GDAL_DISABLE_READDIR_ON_OPEN=EMPTY_DIR to avoid extra directory requests.
+        
         Parameters:
         -----------
         description : str
@@ -393,7 +706,8 @@ class GEEFireRiskAnalyzer:
         scale : int
             Pixel resolution in meters
         """
-        composite = self.create_analysis_composite()
+        # GeoTIFF bands must share one data type, so export everything as float32
+        composite = self.create_analysis_composite().toFloat()
         
         task = ee.batch.Export.image.toDrive(
             image=composite,
@@ -401,7 +715,8 @@ class GEEFireRiskAnalyzer:
             scale=scale,
             region=self.aoi,
             maxPixels=1e13,
-            fileFormat='GeoTIFF'
+            fileFormat='GeoTIFF',
+            formatOptions={'cloudOptimized': True}
         )
         
         task.start()
@@ -411,6 +726,47 @@ class GEEFireRiskAnalyzer:
         
         return task
     
+    def cache_composite(self, scale=None, overwrite=False):
+        """
+        Save the median composite to an Earth Engine asset for repeated analysis
+        
+        Later analyzers created with use_cached_composite=True for the same
+        AOI, dates and satellite will load the asset instead of recomputing it.
+        
+        Parameters:
+        -----------
+        scale : int
+            Pixel resolution in meters (defaults to 10 for Sentinel-2, 30 for Landsat)
+        overwrite : bool
+            Rebuild the composite from the image collection and replace an existing asset
+        """
+        if self.loaded_from_cache and not overwrite:
+            print(f"Composite already cached at: {self.composite_asset_id}")
+            print("Pass overwrite=True to rebuild it from the image collection")
+            return None
+        
+        if scale is None:
+            scale = 10 if self.satellite == 'sentinel2' else 30
+        
+        # self.image is the asset itself when loaded from the cache, so rebuild it
+        image = self._build_composite() if self.loaded_from_cache else self.image
+        
+        task = ee.batch.Export.image.toAsset(
+            image=image,
+            description='fire_risk_composite_cache',
+            assetId=self.composite_asset_id,
+            scale=scale,
+            region=self.aoi,
+            maxPixels=1e13,
+            overwrite=overwrite
+        )
+        
+        task.start()
+        print(f"Composite cache task started: {self.composite_asset_id}")
+        print(f"Check status at: https://code.earthengine.google.com/tasks")
+        
+        return task
+    
     def generate_statistics_report(self):
         """
         Generate summary statistics for the area
@@ -420,11 +776,11 @@ class GEEFireRiskAnalyzer:
         print("=" * 70)
         
         # Calculate statistics for the AOI
-        ndvi = self.calculate_ndvi()
-        savi = self.calculate_savi()
-        ndmi = self.calculate_ndmi()
-        fire_risk = self.calculate_fire_risk_score()
-        risk_class = self.classify_fire_risk(fire_risk)
+        ndvi = self.ndvi
+        savi = self.savi
+        ndmi = self.ndmi
+        fire_risk = self.fire_risk
+        risk_class = self.risk_class
         
         # Reducer for statistics
         stats_reducer = ee.Reducer.mean() \
@@ -432,73 +788,63 @@ class GEEFireRiskAnalyzer:
             .combine(ee.Reducer.min(), '', True) \
             .combine(ee.Reducer.max(), '', True)
         
-        print("\n1. VEGETATION INDICES SUMMARY")
-        print("-" * 70)
+        # Coarsen the scale for large areas so at most ~50k pixels are reduced.
+        # Computed server-side so it doesn't cost an extra round-trip.
+        target_scale = self.aoi.area(maxError=1).divide(50000).sqrt().max(30)
         
-        # NDVI stats
-        ndvi_stats = ndvi.reduceRegion(
+        # All index statistics in a single pass over a multi-band image
+        index_stats = ee.Image.cat([ndvi, savi, ndmi, fire_risk]).reduceRegion(
             reducer=stats_reducer,
             geometry=self.aoi,
-            scale=30,
+            scale=target_scale,
             maxPixels=1e9
-        ).getInfo()
-        
-        print(f"NDVI - Mean: {ndvi_stats.get('NDVI_mean', 0):.3f}, "
-              f"Std: {ndvi_stats.get('NDVI_stdDev', 0):.3f}")
-        print(f"       Range: [{ndvi_stats.get('NDVI_min', 0):.3f}, "
-              f"{ndvi_stats.get('NDVI_max', 0):.3f}]")
+        )
         
-        # SAVI stats
-        savi_stats = savi.reduceRegion(
-            reducer=stats_reducer,
+        # Area of every risk class in one grouped reduction
+        class_areas = ee.Image.pixelArea().addBands(risk_class).reduceRegion(
+            reducer=ee.Reducer.sum().group(groupField=1, groupName='class'),
             geometry=self.aoi,
-            scale=30,
+            scale=target_scale,
             maxPixels=1e9
-        ).getInfo()
+        )
         
-        print(f"SAVI - Mean: {savi_stats.get('SAVI_mean', 0):.3f}, "
-              f"Std: {savi_stats.get('SAVI_stdDev', 0):.3f}")
+        # Pack everything into one dictionary so the report needs a single round-trip
+        report = ee.Dictionary({
+            'stats': index_stats,
+            'areas': class_areas,
+            'scale': target_scale
+        }).getInfo()
         
-        # NDMI stats
-        ndmi_stats = ndmi.reduceRegion(
-            reducer=stats_reducer,
-            geometry=self.aoi,
-            scale=30,
-            maxPixels=1e9
-        ).getInfo()
+        stats = report.get('stats', {})
+        areas = {int(group['class']): group['sum'] for group in report.get('areas', {}).get('groups', [])}
         
-        print(f"NDMI - Mean: {ndmi_stats.get('NDMI_mean', 0):.3f}, "
-              f"Std: {ndmi_stats.get('NDMI_stdDev', 0):.3f}")
+        print(f"Statistics computed at {report.get('scale', 30):.0f}m resolution")
         
-        print("\n2. FIRE RISK DISTRIBUTION")
+        print("\n1. VEGETATION INDICES SUMMARY")
         print("-" * 70)
         
-        # Calculate area for each risk class
-        area_image = ee.Image.pixelArea()
+        print(f"NDVI - Mean: {stats.get('NDVI_mean', 0):.3f}, "
+              f"Std: {stats.get('NDVI_stdDev', 0):.3f}")
+        print(f"       Range: [{stats.get('NDVI_min', 0):.3f}, "
+              f"{stats.get('NDVI_max', 0):.3f}]")
+        
+        print(f"SAVI - Mean: {stats.get('SAVI_mean', 0):.3f}, "
+              f"Std: {stats.get('SAVI_stdDev', 0):.3f}")
+        
+        print(f"NDMI - Mean: {stats.get('NDMI_mean', 0):.3f}, "
+              f"Std: {stats.get('NDMI_stdDev', 0):.3f}")
+        
+        print("\n2. FIRE RISK DISTRIBUTION")
+        print("-" * 70)
         
         for risk_level, label in enumerate(['Very Low', 'Low', 'Moderate', 'High', 'Very High'], 1):
-            mask = risk_class.eq(risk_level)
-            area = area_image.updateMask(mask).reduceRegion(
-                reducer=ee.Reducer.sum(),
-                geometry=self.aoi,
-                scale=30,
-                maxPixels=1e9
-            ).getInfo()
-            
-            area_km2 = area.get('area', 0) / 1e6
+            area_km2 = areas.get(risk_level, 0) / 1e6
             print(f"{label:12s}: {area_km2:.2f} km²")
         
         print("\n3. OVERALL FIRE RISK ASSESSMENT")
         print("-" * 70)
         
-        risk_stats = fire_risk.reduceRegion(
-            reducer=ee.Reducer.mean(),
-            geometry=self.aoi,
-            scale=30,
-            maxPixels=1e9
-        ).getInfo()
-        
-        avg_risk = risk_stats.get('Fire_Risk_Score', 0)
+        avg_risk = stats.get('Fire_Risk_Score_mean', 0)
         print(f"Average Fire Risk Score: {avg_risk:.2f}/100")
         
         if avg_risk < 30:
@@ -529,9 +875,19 @@ class GEEFireRiskAnalyzer:
                 return
             data = self.image_data
         
-        fig, axes = plt.subplots(3, 3, figsize=(18, 16))
-        fig.suptitle('Fire Risk Vegetation Analysis (Google Earth Engine)', 
-                     fontsize=16, fontweight='bold')
+        # Build the figure once and clear it on later calls; rebuild it if pyplot
+        # has dropped it (window closed, or the inline backend closed it after a cell)
+        if self._fig is None or not plt.fignum_exists(self._fig.number):
+            self._fig, self._axes = plt.subplots(3, 3, figsize=(18, 16))
+            self._fig.suptitle('Fire Risk Vegetation Analysis (Google Earth Engine)', 
+                               fontsize=16, fontweight='bold')
+        else:
+            for cbar in self._colorbars:
+                cbar.remove()
+            for ax in self._axes.flat:
+                ax.clear()
+        self._colorbars = []
+        fig, axes = self._fig, self._axes
         
         # Plot each metric
         metrics = [
@@ -550,9 +906,10 @@ class GEEFireRiskAnalyzer:
             row, col = idx // 3, idx % 3
             
             if name in data:
-                im = axes[row, col].imshow(data[name], cmap=cmap, vmin=vmin, vmax=vmax)
+                im = axes[row, col].imshow(data[name], cmap=cmap, vmin=vmin, vmax=vmax,
+                                           interpolation='nearest')
                 axes[row, col].set_title(name.replace('_', ' '))
-                plt.colorbar(im, ax=axes[row, col])
+                self._colorbars.append(fig.colorbar(im, ax=axes[row, col]))
             else:
                 axes[row, col].text(0.5, 0.5, f'{name}\nNot Available', 
                                    ha='center', va='center', 
@@ -561,10 +918,99 @@ class GEEFireRiskAnalyzer:
             axes[row, col].set_xticks([])
             axes[row, col].set_yticks([])
         
-        plt.tight_layout()
-        plt.savefig('fire_risk_analysis_gee.png', dpi=300, bbox_inches='tight')
+        fig.tight_layout()
+        fig.savefig('fire_risk_analysis_gee.png', dpi=300, bbox_inches='tight')
         print("Visualization saved to 'fire_risk_analysis_gee.png'")
-        plt.show()
+        
+        # Nothing to show with a non-interactive backend (e.g. Agg in script runs)
+        if matplotlib.get_backend().lower() != 'agg':
+            plt.show()
+    
+    def save_local_composite(self, data=None, path='fire_risk_composite.tif'):
+        """
+        Write downloaded data to a Cloud Optimized GeoTIFF with overviews
+        
+        Parameters:
+        -----------
+        data : dict
+            Arrays from download_data_for_local_analysis() (defaults to the last download)
+        path : str
+            Output file path
+        
+        Returns:
+        --------
+        str : Path of the written file
+        """
+        if data is None:
+            data = self.image_data
+        if data is None or self.image_profile is None:
+            print("No data available. Run download_data_for_local_analysis() first.")
+            return None
+        
+        layers = list(data)
+        height, width = data[layers[0]].shape
+        
+        # Internal overviews let tile clients read only the zoom level they display
+        with rasterio.open(
+            path, 'w',
+            driver='COG',
+            count=len(layers),
+            dtype='float32',
+            height=height,
+            width=width,
+            crs=self.image_profile['crs'],
+            transform=self.image_profile['transform'],
+            compress='deflate',
+            overviews='IGNORE_EXISTING',
+            overview_resampling='average'
+        ) as dst:
+            for band, name in enumerate(layers, 1):
+                dst.write(data[name].astype(np.float32, copy=False), band)
+                dst.set_band_description(band, name)
+        
+        print(f"Composite saved to '{path}'")
+        return path
+    
+    def visualize_local_tiles(self, path='fire_risk_composite.tif'):
+        """
+        Create interactive map of a saved composite served by localtileserver
+        
+        Only the tiles in the current viewport are rendered, so this scales to
+        downloads that are too large for visualize_local_analysis().
+        """
+        if not LOCALTILESERVER_AVAILABLE:
+            print("localtileserver is not installed. Run: pip install localtileserver")
+            return None
+        
+        client = TileClient(path)
+        with rasterio.open(path) as src:
+            descriptions = list(src.descriptions)
+        
+        Map = folium.Map(location=client.center(), zoom_start=client.default_zoom)
+        
+        metrics = [
+            ('NDVI', 'RdYlGn', -0.2, 0.8),
+            ('NDMI', 'RdYlBu', -0.5, 0.5),
+            ('BSI', 'YlOrBr', -1, 1),
+            ('Fire_Risk_Score', 'YlOrRd', 0, 100),
+            ('Risk_Class', 'RdYlGn_r', 1, 5)
+        ]
+        
+        for name, cmap, vmin, vmax in metrics:
+            if name in descriptions:
+                get_folium_tile_layer(
+                    client,
+                    indexes=descriptions.index(name) + 1,
+                    colormap=cmap,
+                    vmin=vmin,
+                    vmax=vmax,
+                    name=name.replace('_', ' '),
+                    overlay=True
+                ).add_to(Map)
+        
+        folium.LayerControl().add_to(Map)
+        
+        return Map
 
 
 # ============ EXAMPLE USAGE ============
@@ -667,6 +1113,9 @@ if __name__ == "__main__":
     print("\nNOTE: Make sure you've authenticated first by running auth_fix.py")
     print("=" * 70)
     
+    # Script runs only save the plots, so skip interactive GUI backends
+    matplotlib.use('Agg')
+    
     # Run example
     analyzer = example_california_wildfire_area()
     